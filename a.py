@@ -3,16 +3,113 @@ from PIL import ImageFile
 sys.modules['ImageFile'] = ImageFile
 import cv2
 import os
+import glob
+import shutil
 import tempfile
 import re
 import uuid
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from fpdf import FPDF
-from PIL import Image
-from skimage.metrics import structural_similarity as ssim
+import numpy as np
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 
+DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+
+# Files at least this large are fetched as parallel HTTP Range requests when
+# the server supports them
+DOWNLOAD_RANGE_PARTS = 4
+DOWNLOAD_RANGE_MIN_SIZE = 8 * 1024 * 1024
+
+# One keep-alive session for API calls and downloads, so retries and range
+# parts reuse pooled connections instead of a new TCP + TLS handshake each.
+# Retry only covers idempotent requests (GET/HEAD), not the API POST.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=DOWNLOAD_RANGE_PARTS * 2,
+                                      max_retries=Retry(total=2, backoff_factor=0.5,
+                                                        status_forcelist=(502, 503, 504))))
+
+def request_download_url(url):
+    """Ask the cobalt.tools API (free, no auth needed) for a direct video URL"""
+    # Cobalt API endpoint
+    api_url = "https://api.cobalt.tools/api/json"
+    
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/json"
+    }
+    
+    payload = {
+        "url": url,
+        "vCodec": "h264",
+        "vQuality": "720",
+        "aFormat": "mp3",
+        "isAudioOnly": False,
+        "filenamePattern": "basic"
+    }
+    
+    response = SESSION.post(api_url, json=payload, headers=headers, timeout=30)
+    
+    if response.status_code != 200:
+        st.warning(f"API request failed with status {response.status_code}")
+        return None
+    
+    data = response.json()
+    
+    if data.get("status") == "redirect" or data.get("status") == "stream":
+        download_url = data.get("url")
+        if download_url:
+            return download_url
+        st.warning("No download URL in API response")
+    elif data.get("status") == "error":
+        st.warning(f"API Error: {data.get('text', 'Unknown error')}")
+    else:
+        st.warning(f"Unexpected API status: {data.get('status')}")
+    
+    return None
+
+def get_range_download(download_url):
+    """Return (final_url, size) if the file can be fetched in byte ranges, else None"""
+    response = SESSION.head(download_url, allow_redirects=True, timeout=30)
+    size = int(response.headers.get("Content-Length", 0))
+    
+    if response.status_code != 200 or response.headers.get("Accept-Ranges") != "bytes":
+        return None
+    if size < DOWNLOAD_RANGE_MIN_SIZE:
+        return None
+    return response.url, size
+
+def download_ranges(download_url, filename, size, parts=DOWNLOAD_RANGE_PARTS):
+    """Download a file as concurrent Range requests, each written at its own offset"""
+    # Preallocate so every part can seek straight to its offset
+    with open(filename, 'wb') as f:
+        f.truncate(size)
+    
+    part_size = -(-size // parts)
+    ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+    
+    def fetch(byte_range):
+        start, end = byte_range
+        response = SESSION.get(download_url, headers={"Range": f"bytes={start}-{end}"},
+                                stream=True, timeout=120)
+        if response.status_code != 206:
+            raise IOError(f"Range request failed with status {response.status_code}")
+        
+        with open(filename, 'r+b', buffering=DOWNLOAD_BUFFER_SIZE) as f:
+            f.seek(start)
+            shutil.copyfileobj(response.raw, f, length=DOWNLOAD_BUFFER_SIZE)
+            if f.tell() != end + 1:
+                raise IOError(f"Incomplete download of bytes {start}-{end}")
+    
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        # list() re-raises the first failed part here
+        list(pool.map(fetch, ranges))
+
 def download_video_via_api(url, max_retries=3):
     """Download video using cobalt.tools API (free, no auth needed)"""
     unique_id = str(uuid.uuid4())[:8]
@@ -22,59 +119,37 @@ def download_video_via_api(url, max_retries=3):
     if os.path.exists(filename):
         os.remove(filename)
     
-    # Cobalt API endpoint
-    api_url = "https://api.cobalt.tools/api/json"
-    
     for attempt in range(max_retries):
         try:
             st.info(f"Downloading video via API (attempt {attempt + 1}/{max_retries})...")
             
-            # Request download link from Cobalt
-            headers = {
-                "Accept": "application/json",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "url": url,
-                "vCodec": "h264",
-                "vQuality": "720",
-                "aFormat": "mp3",
-                "isAudioOnly": False,
-                "filenamePattern": "basic"
-            }
+            # Request a fresh download link from Cobalt on every attempt
+            download_url = request_download_url(url)
             
-            response = requests.post(api_url, json=payload, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
+            if download_url:
+                # Download the video file
+                st.info("Downloading video file...")
+                range_download = get_range_download(download_url)
+                
+                if range_download:
+                    final_url, size = range_download
+                    download_ranges(final_url, filename, size)
+                    st.success("Video downloaded successfully!")
+                    return filename
                 
-                if data.get("status") == "redirect" or data.get("status") == "stream":
-                    download_url = data.get("url")
+                video_response = SESSION.get(download_url, stream=True, timeout=120)
+                
+                if video_response.status_code == 200:
+                    # Copy the raw stream in 1 MB blocks instead of looping over 8 KB chunks
+                    video_response.raw.decode_content = True
+                    with open(filename, 'wb', buffering=DOWNLOAD_BUFFER_SIZE) as f:
+                        shutil.copyfileobj(video_response.raw, f, length=DOWNLOAD_BUFFER_SIZE)
                     
-                    if download_url:
-                        # Download the video file
-                        st.info("Downloading video file...")
-                        video_response = requests.get(download_url, stream=True, timeout=120)
-                        
-                        if video_response.status_code == 200:
-                            with open(filename, 'wb') as f:
-                                for chunk in video_response.iter_content(chunk_size=8192):
-                                    f.write(chunk)
-                            
-                            if os.path.exists(filename) and os.path.getsize(filename) > 0:
-                                st.success("Video downloaded successfully!")
-                                return filename
-                        else:
-                            st.warning(f"Failed to download video file. Status: {video_response.status_code}")
-                    else:
-                        st.warning("No download URL in API response")
-                elif data.get("status") == "error":
-                    st.warning(f"API Error: {data.get('text', 'Unknown error')}")
+                    if os.path.exists(filename) and os.path.getsize(filename) > 0:
+                        st.success("Video downloaded successfully!")
+                        return filename
                 else:
-                    st.warning(f"Unexpected API status: {data.get('status')}")
-            else:
-                st.warning(f"API request failed with status {response.status_code}")
+                    st.warning(f"Failed to download video file. Status: {video_response.status_code}")
             
         except Exception as e:
             st.warning(f"Download attempt {attempt + 1}/{max_retries} failed: {str(e)[:200]}")
@@ -90,36 +165,191 @@ def download_video_via_api(url, max_retries=3):
     
     return None
 
+# Shorts, youtu.be, watch?v= and live URLs, matched in a single scan
+VIDEO_ID_RE = re.compile(r"(?:shorts/|youtu\.be/|v=|live/)([\w\-]+)")
+
 def get_video_id(url):
     """Extract video ID from various YouTube URL formats"""
-    # Match YouTube Shorts URLs
-    video_id_match = re.search(r"shorts\/(\w+)", url)
-    if video_id_match:
-        return video_id_match.group(1)
-    
-    # Match youtube.be shortened URLs
-    video_id_match = re.search(r"youtu\.be\/([\w\-_]+)(\?.*)?", url)
-    if video_id_match:
-        return video_id_match.group(1)
-    
-    # Match regular YouTube URLs
-    video_id_match = re.search(r"v=([\w\-_]+)", url)
-    if video_id_match:
-        return video_id_match.group(1)
-    
-    # Match YouTube live stream URLs
-    video_id_match = re.search(r"live\/(\w+)", url)
-    if video_id_match:
-        return video_id_match.group(1)
+    video_id_match = VIDEO_ID_RE.search(url)
+    return video_id_match.group(1) if video_id_match else None
+
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+# Mean squared pixel difference bounds for the pre-SSIM gate: below the first,
+# frames are treated as identical; above the second, as a definite change.
+FRAME_IDENTICAL_MSE = 4.0
+FRAME_CHANGED_MSE = 6000.0
+
+# Ambiguous pairs whose dHashes differ in fewer bits than this count as similar,
+# provided their MSE is also below DHASH_SIMILAR_MSE. dHash ignores brightness
+# and contrast, so fades (MSE ~60+ per sample, SSIM down to ~0.3) need SSIM;
+# camera/codec noise on a static slide stays around 5-35.
+DHASH_SIMILAR_BITS = 6
+DHASH_SIMILAR_MSE = 40.0
+
+# Largest mean squared difference of any 32x32 block for two saved frames to
+# count as the same picture (video/JPEG noise measured < 100, one changed
+# character > 2000)
+REPEAT_BLOCK_MSE = 400.0
+
+# Frames are stored as JPEG so FPDF can embed them without recompression
+JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 85]
+
+# Saved frames waiting for the JPEG writer thread; decoding blocks when full
+WRITE_QUEUE_SIZE = 8
+
+# Sampled frames are decoded and compared this many at a time
+SAMPLE_BATCH_SIZE = 16
+
+def fast_ssim(a, b, win=7):
+    """Mean SSIM of two uint8 grayscale images, computed in closed form with OpenCV
     
-    return None
+    Same definition as skimage's structural_similarity defaults (uniform 7x7
+    window, sample covariance, border of win // 2 excluded, data_range=255), but
+    built from five cv2.boxFilter passes over float32 copies of the images.
+    """
+    x = a.astype(np.float32)
+    y = b.astype(np.float32)
+    
+    def window_mean(image):
+        return cv2.boxFilter(image, -1, (win, win), borderType=cv2.BORDER_REFLECT)
+    
+    n = win * win
+    sample = n / (n - 1)
+    mu_x = window_mean(x)
+    mu_y = window_mean(y)
+    var_x = sample * (window_mean(x * x) - mu_x * mu_x)
+    var_y = sample * (window_mean(y * y) - mu_y * mu_y)
+    cov_xy = sample * (window_mean(x * y) - mu_x * mu_y)
+    
+    ssim_map = ((2 * mu_x * mu_y + SSIM_C1) * (2 * cov_xy + SSIM_C2)) / \
+               ((mu_x * mu_x + mu_y * mu_y + SSIM_C1) * (var_x + var_y + SSIM_C2))
+    pad = win // 2
+    return float(ssim_map[pad:-pad, pad:-pad].mean(dtype=np.float64))
+
+def dhash(grays):
+    """64-bit difference hashes (signs of 9x8 horizontal gradients) of gray frames"""
+    small = np.stack([cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA) for gray in grays])
+    bits = small[:, :, 1:] > small[:, :, :-1]
+    return np.packbits(bits.reshape(len(grays), -1), axis=1).view(np.uint64).ravel()
+
+def frame_similarities(grays, previous):
+    """Similarity of each gray frame in a batch to the frame sampled before it
+    
+    The L2 gate is evaluated for the whole batch in one vectorised pass. Pairs it
+    leaves ambiguous are checked by dHash Hamming distance (XOR + popcount), and
+    SSIM only runs on the ones whose hashes differ.
+    """
+    before = np.concatenate((previous[None], grays[:-1]))
+    # cv2.absdiff stays in uint8 (one SIMD pass), only the squares need widening
+    diff = cv2.absdiff(grays, before).reshape(len(grays), -1).astype(np.int32)
+    mse = np.einsum('ij,ij->i', diff, diff) / diff.shape[1]
+    
+    similarities = np.where(mse < FRAME_IDENTICAL_MSE, 1.0, 0.0)
+    ambiguous = (mse >= FRAME_IDENTICAL_MSE) & (mse <= FRAME_CHANGED_MSE)
+    if not ambiguous.any():
+        return similarities
+    
+    hashes = dhash(np.concatenate((previous[None], grays)))
+    distances = np.bitwise_count(hashes[1:] ^ hashes[:-1])
+    similar = (distances < DHASH_SIMILAR_BITS) & (mse < DHASH_SIMILAR_MSE)
+    similarities[ambiguous & similar] = 1.0
+    for i in np.flatnonzero(ambiguous & ~similar):
+        similarities[i] = fast_ssim(grays[i], before[i])
+    return similarities
+
+def open_video_capture(video_file):
+    """Open a video for decoding, using hardware decode (NVDEC/VAAPI/...) when available"""
+    # OpenCV silently falls back to software decoding if no accelerator is usable
+    return cv2.VideoCapture(video_file, cv2.CAP_ANY,
+                            [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+
+def label_brightness(frame):
+    """Mean luma of the top-left region where the PDF timestamp label is drawn"""
+    region = cv2.cvtColor(frame[5:20, 5:65], cv2.COLOR_BGR2GRAY)
+    return int(region.mean())
+
+def same_picture(a, b):
+    """True if two full-resolution BGR frames differ only by compression noise"""
+    # Noise is spread thinly over the frame, while a real edit (even a single
+    # changed character) concentrates its error in a few 32x32 blocks
+    diff = cv2.cvtColor(cv2.absdiff(a, b), cv2.COLOR_BGR2GRAY).astype(np.float32)
+    h, w = diff.shape
+    block_mse = cv2.resize(diff * diff, (max(w // 32, 1), max(h // 32, 1)), interpolation=cv2.INTER_AREA)
+    return block_mse.max() < REPEAT_BLOCK_MSE
+
+def frame_writer(write_queue):
+    """Encode and write queued (path, frame) pairs as JPEG until a None arrives"""
+    while True:
+        item = write_queue.get()
+        try:
+            if item is None:
+                break
+            frame_path, frame = item
+            cv2.imwrite(frame_path, frame, JPEG_PARAMS)
+        finally:
+            write_queue.task_done()
+
+class SavedImages:
+    """Gray tiles and paths of the frames written so far
+    
+    The tiles are kept in one contiguous (N, 72, 128) array rather than a list of
+    pairs, so a new frame is compared against every saved frame in a single
+    vectorised pass.
+    """
+    def __init__(self):
+        self.tiles = np.empty((64, 72, 128), dtype=np.uint8)
+        self.paths = []
+    
+    def candidates(self, gray):
+        """Paths of saved frames whose tile is practically identical to `gray`"""
+        count = len(self.paths)
+        if not count:
+            return []
+        diff = self.tiles[:count].reshape(count, -1).astype(np.int32) - gray.reshape(-1)
+        mse = np.einsum('ij,ij->i', diff, diff) / gray.size
+        return [self.paths[i] for i in np.flatnonzero(mse < FRAME_IDENTICAL_MSE)]
+    
+    def add(self, gray, path):
+        count = len(self.paths)
+        if count == len(self.tiles):
+            self.tiles = np.concatenate((self.tiles, np.empty_like(self.tiles)))
+        self.tiles[count] = gray
+        self.paths.append(path)
+
+def write_frame(frame, gray, frame_path, saved_images, write_queue):
+    """Queue a frame for writing as JPEG unless the same picture was already saved
+    
+    Returns the path to use for the frame. A repeat of an earlier frame (e.g. a
+    slide shown again) reuses that file, so FPDF embeds the image once and
+    references it from every page that shows it. Candidates are found with the
+    128x72 gray tile and confirmed against the full-resolution JPEG.
+    """
+    for path in saved_images.candidates(gray):
+        # The earlier JPEG may still be in the writer queue
+        write_queue.join()
+        earlier = cv2.imread(path)
+        if earlier is not None and earlier.shape == frame.shape and same_picture(frame, earlier):
+            return path
+    
+    # The frame lives in a reused decode buffer, so the writer gets its own copy
+    write_queue.put((frame_path, frame.copy()))
+    saved_images.add(gray, frame_path)
+    return frame_path
 
-def extract_unique_frames(video_file, output_folder, n=3, ssim_threshold=0.8):
-    """Extract unique frames from video using SSIM comparison"""
-    cap = cv2.VideoCapture(video_file)
+def extract_unique_frames(video_file, output_folder, n=3, ssim_threshold=0.8, allow_truncated=True):
+    """Extract unique frames from video using SSIM comparison
+    
+    `video_file` may also be an http(s) URL, which FFmpeg decodes as it downloads.
+    With allow_truncated=False, a video that ends more than a second short of its
+    reported length, or whose length is not reported at all, yields no frames
+    instead of a possibly partial result.
+    """
+    cap = open_video_capture(video_file)
     
     if not cap.isOpened():
-        st.error(f"Failed to open video file: {video_file}")
+        st.warning("Failed to open video for frame extraction")
         return []
     
     fps = int(cap.get(cv2.CAP_PROP_FPS))
@@ -128,6 +358,8 @@ def extract_unique_frames(video_file, output_folder, n=3, ssim_threshold=0.8):
     
     last_frame = None
     saved_frame = None
+    saved_gray = None
+    saved_images = SavedImages()
     frame_number = 0
     last_saved_frame_number = -1
     timestamps = []
@@ -135,102 +367,151 @@ def extract_unique_frames(video_file, output_folder, n=3, ssim_threshold=0.8):
     progress_bar = st.progress(0)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
+    if not allow_truncated and total_frames <= 0:
+        # A dropped connection would look like the end of the video
+        st.warning("Video length unknown, cannot tell a complete stream from a cut one")
+        cap.release()
+        return []
+    
+    # JPEG encoding runs on its own thread, overlapping with decoding
+    write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    writer = threading.Thread(target=frame_writer, args=(write_queue,), daemon=True)
+    writer.start()
+    
+    try:
+        grays = np.empty((SAMPLE_BATCH_SIZE, 72, 128), dtype=np.uint8)
+        frames = []
+        frame_numbers = []
         
-        # Update progress
-        if total_frames > 0:
-            progress_bar.progress(min(frame_number / total_frames, 1.0))
+        # Sampled frames are decoded into a ring of reusable BGR buffers instead of a
+        # fresh array per read. One slot more than a batch keeps `saved_frame` (the
+        # previous batch's last sample) intact while the next batch is decoded.
+        frame_buffers = None
+        frames_read = 0
         
-        if frame_number % n == 0:
-            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            gray_frame = cv2.resize(gray_frame, (128, 72))
+        while True:
+            # Decode the next batch of sampled frames, downscaling into the gray buffer
+            frames.clear()
+            frame_numbers.clear()
+            ended = False
+            
+            while len(frames) < SAMPLE_BATCH_SIZE:
+                if frame_number % n:
+                    # Frames between samples are only grabbed: no BGR conversion or copy.
+                    # (Seeking with CAP_PROP_POS_FRAMES benchmarked ~3x slower than this.)
+                    ret = cap.grab()
+                else:
+                    buffer = None if frame_buffers is None else frame_buffers[frames_read % len(frame_buffers)]
+                    ret, frame = cap.read(buffer)
+                    if ret:
+                        if frame_buffers is None:
+                            frame_buffers = np.empty((SAMPLE_BATCH_SIZE + 1, *frame.shape), dtype=np.uint8)
+                        frames_read += 1
+                        # Shrink first so the colour conversion only touches 128x72 pixels
+                        small_frame = cv2.resize(frame, (128, 72))
+                        cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY, dst=grays[len(frames)])
+                        frames.append(frame)
+                        frame_numbers.append(frame_number)
+                
+                if not ret:
+                    ended = True
+                    break
+                frame_number += 1
             
-            if last_frame is not None:
-                similarity = ssim(gray_frame, last_frame, data_range=gray_frame.max() - gray_frame.min())
+            if frames:
+                batch = grays[:len(frames)]
+                similarities = frame_similarities(batch, batch[0] if last_frame is None else last_frame)
                 
-                if similarity < ssim_threshold:
-                    if saved_frame is not None and frame_number - last_saved_frame_number > fps:
-                        timestamp_seconds = frame_number // fps
-                        frame_path = os.path.join(output_folder, f'frame{frame_number:04d}_{timestamp_seconds}.png')
-                        cv2.imwrite(frame_path, saved_frame)
-                        timestamps.append((frame_number, timestamp_seconds))
+                for number, frame, gray, similarity in zip(frame_numbers, frames, batch, similarities):
+                    if saved_frame is not None:
+                        if similarity < ssim_threshold:
+                            if number - last_saved_frame_number > fps:
+                                timestamp_seconds = number // fps
+                                frame_path = os.path.join(output_folder, f'frame{number:04d}_{timestamp_seconds}.jpg')
+                                frame_path = write_frame(saved_frame, saved_gray, frame_path, saved_images, write_queue)
+                                timestamps.append((number, timestamp_seconds, label_brightness(saved_frame), frame_path))
+                            
+                            last_saved_frame_number = number
+                    else:
+                        # First frame
+                        timestamp_seconds = number // fps
+                        frame_path = os.path.join(output_folder, f'frame{number:04d}_{timestamp_seconds}.jpg')
+                        frame_path = write_frame(frame, gray, frame_path, saved_images, write_queue)
+                        timestamps.append((number, timestamp_seconds, label_brightness(frame), frame_path))
+                        last_saved_frame_number = number
                     
                     saved_frame = frame
-                    last_saved_frame_number = frame_number
-                else:
-                    saved_frame = frame
-            else:
-                # First frame
-                timestamp_seconds = frame_number // fps
-                frame_path = os.path.join(output_folder, f'frame{frame_number:04d}_{timestamp_seconds}.png')
-                cv2.imwrite(frame_path, frame)
-                timestamps.append((frame_number, timestamp_seconds))
-                saved_frame = frame
-                last_saved_frame_number = frame_number
+                    saved_gray = gray
+                
+                # The gray buffer is reused by the next batch, keep a copy of the last tile
+                last_frame = batch[-1].copy()
+                saved_gray = last_frame
+                
+                # Update progress
+                if total_frames > 0:
+                    progress_bar.progress(min(frame_number / total_frames, 1.0))
             
-            last_frame = gray_frame
+            if ended:
+                break
         
-        frame_number += 1
-    
-    # Save the last saved frame if it exists
-    if saved_frame is not None and last_saved_frame_number < frame_number - fps:
-        timestamp_seconds = frame_number // fps
-        frame_path = os.path.join(output_folder, f'frame{frame_number:04d}_{timestamp_seconds}.png')
-        cv2.imwrite(frame_path, saved_frame)
-        timestamps.append((frame_number, timestamp_seconds))
+        if not allow_truncated and total_frames > 0 and frame_number < total_frames - fps:
+            st.warning(f"Video ended early ({frame_number}/{total_frames} frames decoded)")
+            return []
+        
+        # Save the last saved frame if it exists
+        if saved_frame is not None and last_saved_frame_number < frame_number - fps:
+            timestamp_seconds = frame_number // fps
+            frame_path = os.path.join(output_folder, f'frame{frame_number:04d}_{timestamp_seconds}.jpg')
+            frame_path = write_frame(saved_frame, saved_gray, frame_path, saved_images, write_queue)
+            timestamps.append((frame_number, timestamp_seconds, label_brightness(saved_frame), frame_path))
+    finally:
+        # Stop the writer once it has written every queued JPEG (the PDF reads
+        # them next) and release the decoder, also when decoding raises
+        write_queue.put(None)
+        writer.join()
+        cap.release()
     
     progress_bar.progress(1.0)
-    cap.release()
     return timestamps
 
-def convert_frames_to_pdf(input_folder, output_file, timestamps):
+def convert_frames_to_pdf(output_file, timestamps):
     """Convert extracted frames to PDF with timestamps"""
-    frame_files = sorted(os.listdir(input_folder), 
-                        key=lambda x: int(x.split('_')[0].replace('frame', '')))
-    
-    if not frame_files:
+    if not timestamps:
         st.warning("No frames found to convert to PDF")
         return False
     
     pdf = FPDF("L")
     pdf.set_auto_page_break(0)
+    pdf.set_font("Arial", size=12)
+    text_color = None
     
     progress_bar = st.progress(0)
     
-    for idx, (frame_file, (frame_number, timestamp_seconds)) in enumerate(zip(frame_files, timestamps)):
-        progress_bar.progress((idx + 1) / len(frame_files))
-        
-        frame_path = os.path.join(input_folder, frame_file)
+    for idx, (frame_number, timestamp_seconds, brightness, frame_path) in enumerate(timestamps):
+        progress_bar.progress((idx + 1) / len(timestamps))
         
         if not os.path.exists(frame_path):
             continue
         
         try:
-            image = Image.open(frame_path)
             pdf.add_page()
-            pdf.image(frame_path, x=0, y=0, w=pdf.w, h=pdf.h)
+            # JPEG data is embedded verbatim as a /DCTDecode stream, no re-encode
+            pdf.image(frame_path, x=0, y=0, w=pdf.w, h=pdf.h, type='JPG')
             
             # Format timestamp
             timestamp = f"{timestamp_seconds // 3600:02d}:{(timestamp_seconds % 3600) // 60:02d}:{timestamp_seconds % 60:02d}"
             
-            # Determine text color based on background
-            x, y, width, height = 5, 5, 60, 15
-            region = image.crop((x, y, x + width, y + height)).convert("L")
-            mean_pixel_value = region.resize((1, 1)).getpixel((0, 0))
-            
-            if mean_pixel_value < 64:
-                pdf.set_text_color(255, 255, 255)
-            else:
-                pdf.set_text_color(0, 0, 0)
+            # Determine text color based on background (sampled during extraction)
+            x, y = 5, 5
+            color = 255 if brightness < 64 else 0
+            if color != text_color:
+                pdf.set_text_color(color, color, color)
+                text_color = color
             
             pdf.set_xy(x, y)
-            pdf.set_font("Arial", size=12)
             pdf.cell(0, 0, timestamp)
         except Exception as e:
-            st.warning(f"Error processing frame {frame_file}: {e}")
+            st.warning(f"Error processing frame {os.path.basename(frame_path)}: {e}")
             continue
     
     try:
@@ -242,16 +523,85 @@ def convert_frames_to_pdf(input_folder, output_file, timestamps):
 
 def cleanup_temp_files():
     """Clean up any leftover temporary video files"""
+    for pattern in ('video_*.mp4', 'video_*.mp4.part'):
+        for file in glob.iglob(pattern):
+            try:
+                os.remove(file)
+            except OSError:
+                pass
+
+# Generated PDFs (and videos that had to be downloaded in full) are kept per
+# video id, so asking for the same video again skips the download and extraction
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".ytpdf_cache")
+CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+def cached_file(video_id, extension):
+    """Path of the cached file for a video, or None if it is not cached"""
+    path = os.path.join(CACHE_DIR, f"{video_id}.{extension}")
     try:
-        for file in os.listdir('.'):
-            if file.startswith('video_') and file.endswith('.mp4'):
-                try:
-                    os.remove(file)
-                except:
-                    pass
-    except:
+        # Eviction goes by modification time, so mark the entry as recently used
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+def store_in_cache(file, video_id, extension, move=False):
+    """Copy (or move) a file into the cache, then evict least recently used entries"""
+    path = os.path.join(CACHE_DIR, f"{video_id}.{extension}")
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Write under a unique temporary name, so sessions storing the same video
+        # at once never share a partial file, then publish it with one rename
+        fd, part = tempfile.mkstemp(dir=CACHE_DIR, suffix=".part")
+        os.close(fd)
+        try:
+            (shutil.move if move else shutil.copyfile)(file, part)
+            os.replace(part, path)
+        finally:
+            if os.path.exists(part):
+                os.remove(part)
+        prune_cache()
+    except OSError:
         pass
 
+def prune_cache(max_bytes=CACHE_MAX_BYTES):
+    """Delete the least recently used cache entries until the cache fits in max_bytes"""
+    entries = []
+    for entry in os.scandir(CACHE_DIR):
+        # Skip files another session is still writing
+        if entry.is_file() and not entry.name.endswith(".part"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def stream_unique_frames(url, output_folder):
+    """Extract unique frames while the video is still downloading
+    
+    The API's download URL is handed straight to the decoder, so network transfer
+    and frame extraction overlap instead of running back to back, and no
+    intermediate video file is written.
+    """
+    try:
+        stream_url = request_download_url(url)
+    except Exception as e:
+        st.warning(f"Could not get a video stream: {str(e)[:200]}")
+        return []
+    
+    if not stream_url:
+        return []
+    
+    st.info("📸 Extracting unique frames while streaming the video...")
+    return extract_unique_frames(stream_url, output_folder, allow_truncated=False)
+
 def process_single_video(url):
     """Process a single video URL"""
     st.info(f"Processing video...")
@@ -259,48 +609,81 @@ def process_single_video(url):
     # Clean up any old temp files first
     cleanup_temp_files()
     
-    video_file = download_video_via_api(url)
-    if not video_file or not os.path.exists(video_file):
-        st.error("❌ Failed to download video.")
-        st.info("💡 **Alternative options:**")
-        st.markdown("1. Try a different video")
-        st.markdown("2. Download the video manually and use a local tool")
-        st.markdown("3. Use a browser extension for frame extraction")
-        return None
+    video_file = None
+    video_id = get_video_id(url)
     
     try:
         output_pdf_name = f"youtube_frames_{uuid.uuid4().hex[:8]}.pdf"
         
+        cached_pdf = cached_file(video_id, "pdf") if video_id else None
+        if cached_pdf:
+            try:
+                # main() deletes the returned file after serving it, so hand out a copy
+                shutil.copyfile(cached_pdf, output_pdf_name)
+                st.info("♻️ This video was processed recently, reusing its PDF")
+                return output_pdf_name
+            except OSError:
+                # Evicted by another session since the lookup, generate it again
+                pass
+        
         with tempfile.TemporaryDirectory() as temp_folder:
-            st.info("📸 Extracting unique frames...")
-            timestamps = extract_unique_frames(video_file, temp_folder)
+            cached_video = cached_file(video_id, "mp4") if video_id else None
+            if cached_video:
+                st.info("📸 Extracting unique frames from the cached video...")
+                timestamps = extract_unique_frames(cached_video, temp_folder)
+            else:
+                timestamps = stream_unique_frames(url, temp_folder)
+            
+            if not timestamps:
+                # Fall back to downloading the whole file before extracting
+                if cached_video:
+                    # The cached copy is unreadable, drop it so it is replaced
+                    try:
+                        os.remove(cached_video)
+                    except OSError:
+                        pass
+                    st.info("Cached video could not be read, downloading it again...")
+                else:
+                    st.info("Streaming extraction failed, downloading the full video instead...")
+                video_file = download_video_via_api(url)
+                if not video_file or not os.path.exists(video_file):
+                    st.error("❌ Failed to download video.")
+                    st.info("💡 **Alternative options:**")
+                    st.markdown("1. Try a different video")
+                    st.markdown("2. Download the video manually and use a local tool")
+                    st.markdown("3. Use a browser extension for frame extraction")
+                    return None
+                
+                st.info("📸 Extracting unique frames...")
+                timestamps = extract_unique_frames(video_file, temp_folder)
+                
+                if timestamps and video_id:
+                    store_in_cache(video_file, video_id, "mp4", move=True)
             
             if not timestamps:
                 st.warning("No unique frames extracted from video")
                 return None
             
             st.info(f"📄 Creating PDF with {len(timestamps)} frames...")
-            success = convert_frames_to_pdf(temp_folder, output_pdf_name, timestamps)
+            success = convert_frames_to_pdf(output_pdf_name, timestamps)
             
             if not success:
                 return None
         
-        # Clean up video file
-        if os.path.exists(video_file):
-            try:
-                os.remove(video_file)
-            except:
-                pass
+        if video_id:
+            store_in_cache(output_pdf_name, video_id, "pdf")
         
         return output_pdf_name
     except Exception as e:
         st.error(f"Error processing video: {e}")
+        return None
+    finally:
+        # Clean up video file
         if video_file and os.path.exists(video_file):
             try:
                 os.remove(video_file)
             except:
                 pass
-        return None
 
 def main():
     st.title("🎬 YouTube Video to PDF Frame Extractor")